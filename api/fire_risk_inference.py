@@ -6,12 +6,20 @@ Requires fire_risk_model.joblib and feature_names.json in models/ (produced by t
 """
 
 import json
+import warnings
 from pathlib import Path
-from typing import Dict, List, Union
+from typing import Dict, List, Tuple, Union
 
 import joblib
+import numpy as np
 import pandas as pd
 
+# Predictions run on plain ndarrays (columns ordered by _feature_names), so
+# sklearn's fitted-with-feature-names warning does not apply
+warnings.filterwarnings(
+    "ignore", message="X does not have valid feature names", category=UserWarning
+)
+
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 MODELS_DIR = PROJECT_ROOT / "models"
@@ -21,6 +29,9 @@ FEATURE_NAMES_PATH = MODELS_DIR / "feature_names.json"
 _model = None
 _feature_names: List[str] = []
 
+# Parallel tree traversal only pays off for batches at least this large
+_PARALLEL_MIN_ROWS = 64
+
 
 def _ensure_loaded() -> None:
     global _model, _feature_names
@@ -31,6 +42,9 @@ def _ensure_loaded() -> None:
                 "Run models/train_fire_risk_model.py first (when model or dataset changes)."
             )
         _model = joblib.load(MODEL_PATH)
+        # Single-row queries: thread spawn/coordination costs more than the
+        # traversal itself, so force serial prediction by default
+        _model.n_jobs = 1
         with open(FEATURE_NAMES_PATH) as f:
             _feature_names = json.load(f)
 
@@ -41,6 +55,20 @@ def get_feature_names() -> List[str]:
     return list(_feature_names)
 
 
+def _to_array(features: Union[Dict[str, float], pd.DataFrame]) -> np.ndarray:
+    """
+    Convert input to a (rows, n_features) float32 array in feature order.
+
+    For single-row dict calls this skips per-call DataFrame construction and
+    column-name validation, which otherwise dominate the forest traversal cost.
+    """
+    if isinstance(features, dict):
+        return np.asarray(
+            [features[name] for name in _feature_names], dtype=np.float32
+        ).reshape(1, -1)
+    return features[_feature_names].to_numpy(dtype=np.float32)
+
+
 def predict(features: Union[Dict[str, float], pd.DataFrame]) -> int:
     """
     Predict fire risk class: 1 = fire started, 0 = no fire.
@@ -49,11 +77,7 @@ def predict(features: Union[Dict[str, float], pd.DataFrame]) -> int:
               or a DataFrame with those columns (single or multiple rows).
     """
     _ensure_loaded()
-    if isinstance(features, dict):
-        df = pd.DataFrame([features], columns=_feature_names)
-    else:
-        df = features[_feature_names].copy()
-    return int(_model.predict(df)[0])
+    return int(_model.predict(_to_array(features))[0])
 
 
 def predict_proba(features: Union[Dict[str, float], pd.DataFrame]) -> float:
@@ -63,8 +87,33 @@ def predict_proba(features: Union[Dict[str, float], pd.DataFrame]) -> float:
     features: same as predict().
     """
     _ensure_loaded()
-    if isinstance(features, dict):
-        df = pd.DataFrame([features], columns=_feature_names)
-    else:
-        df = features[_feature_names].copy()
-    return float(_model.predict_proba(df)[0][1])
+    return float(_model.predict_proba(_to_array(features))[0][1])
+
+
+def predict_both(features: Union[Dict[str, float], pd.DataFrame]) -> Tuple[int, float]:
+    """
+    Return (predicted class, probability of class 1) from one forest traversal.
+
+    Calling predict() and predict_proba() back-to-back walks all trees twice;
+    use this when both values are needed.
+    """
+    _ensure_loaded()
+    proba = _model.predict_proba(_to_array(features))[0]
+    return int(np.argmax(proba)), float(proba[1])
+
+
+def predict_proba_batch(features: pd.DataFrame) -> np.ndarray:
+    """
+    Return class-1 probabilities for a multi-row DataFrame as a 1-D array.
+
+    Large batches use all cores for the tree traversal; small ones stay serial.
+    """
+    _ensure_loaded()
+    x = _to_array(features)
+    if len(x) >= _PARALLEL_MIN_ROWS:
+        _model.n_jobs = -1
+        try:
+            return _model.predict_proba(x)[:, 1]
+        finally:
+            _model.n_jobs = 1
+    return _model.predict_proba(x)[:, 1]
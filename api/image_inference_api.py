@@ -5,32 +5,139 @@ Serves predictions on POST /predict and POST /predict-from-url endpoints.
 
 import base64
 import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
 from pathlib import Path
 
+import numpy as np
 import requests
 import torch
 import torch.nn as nn
+from requests.adapters import HTTPAdapter, Retry
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from PIL import Image
 from torchvision import models, transforms
+from torchvision.io import ImageReadMode, decode_jpeg
+
+# Optional: orjson response encoder; stdlib json.dumps dominates endpoint CPU
+# when image_base64 bodies run to hundreds of KB
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+
+    class _ORJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+except ImportError:
+    orjson = None
+
+# Optional: SIMD base64 encoder, ~5-10x faster on multi-MB image payloads
+try:
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+# Optional: ONNX Runtime CPU backend (fused Conv+BN+ReLU, no eager dispatch)
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+# Optional: libjpeg-turbo scale-during-decode (much faster for large JPEGs)
+try:
+    from turbojpeg import TJPF_RGB, TurboJPEG
+    _turbo = TurboJPEG()
+except Exception:
+    _turbo = None
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = _ORJSONProvider(app)
 # Enable CORS for all routes (allows React app to call the API)
 CORS(app)
 
+# Persistent connection pool: reuses TCP/TLS connections to repeat image hosts
+# instead of paying a fresh handshake per request
+_http = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 502, 503]),
+)
+_http.mount("https://", _adapter)
+_http.mount("http://", _adapter)
+
 # Script lives in project_root/api/; model lives in project_root/models/
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 MODEL_PATH = PROJECT_ROOT / "models" / "wildfire_resnet18.pth"
+ONNX_PATH = PROJECT_ROOT / "models" / "wildfire_resnet18.onnx"
+INT8_PATH = PROJECT_ROOT / "models" / "wildfire_resnet18_int8.pt"
 
 _model = None
 _preprocess = None
+_session = None  # ONNX Runtime session (used instead of _model when available)
+
+# ImageNet normalization constants (same as training)
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+class _NormalizeUint8(nn.Module):
+    """Fused uint8 scale + normalize: x * a + b with a = 1/(255*std), b = -mean/std.
+
+    Algebraically identical to ConvertImageDtype followed by Normalize, but one
+    elementwise pass fewer over the 3x224x224 tensor per request.
+    """
+
+    def __init__(self, mean, std):
+        super().__init__()
+        self.register_buffer(
+            "a", torch.tensor([1.0 / (255.0 * s) for s in std]).view(3, 1, 1)
+        )
+        self.register_buffer(
+            "b", torch.tensor([-m / s for m, s in zip(mean, std)]).view(3, 1, 1)
+        )
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return x.to(torch.float32).mul_(self.a).add_(self.b)
+
+
+def _image_to_tensor(img_bytes):
+    """Decode image bytes to a uint8 CHW tensor (libjpeg fast path, PIL fallback)."""
+    if img_bytes[:3] == b"\xff\xd8\xff":  # JPEG magic number
+        if _turbo is not None:
+            # Scale during decode: pick the smallest 1/N output that is still
+            # >= 224 px, so the IDCT never materializes the full-size bitmap
+            width, height, _, _ = _turbo.decode_header(img_bytes)
+            for n in (8, 4, 2, 1):
+                if min(width, height) / n >= 224:
+                    break
+            arr = _turbo.decode(img_bytes, pixel_format=TJPF_RGB, scaling_factor=(1, n))
+            return torch.from_numpy(arr).permute(2, 0, 1)
+        data = torch.frombuffer(bytearray(img_bytes), dtype=torch.uint8)
+        return decode_jpeg(data, mode=ImageReadMode.RGB)
+    src = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    # Resize in PIL first so the full-size bitmap never becomes a tensor;
+    # only the 224x224 uint8 buffer is copied out (np.array gives a writable
+    # copy, which torch.from_numpy requires)
+    img = src.resize((224, 224), Image.BILINEAR)
+    src.close()  # release the full-size bitmap as soon as it is consumed
+    return torch.from_numpy(np.array(img)).permute(2, 0, 1)
 
 
 def load_model():
     """Load the ResNet18 model and set up preprocessing."""
-    global _model, _preprocess
+    global _model, _preprocess, _session
 
     if _model is not None:
         return _model, _preprocess
@@ -41,18 +148,98 @@ def load_model():
             "Ensure wildfire_resnet18.pth is in the models/ directory."
         )
 
-    # Setup the model architecture
-    model = models.resnet18()
-    model.fc = nn.Linear(512, 1)  # Binary classification output
-    model.load_state_dict(torch.load(MODEL_PATH, map_location="cpu"))
+    # Setup the model architecture on the meta device: parameters stay
+    # unallocated (no throwaway random init) until the state dict is assigned
+    with torch.device("meta"):
+        model = models.resnet18()
+        model.fc = nn.Linear(512, 1)  # Binary classification output
+    # mmap the checkpoint: tensor storages stay backed by the OS page cache,
+    # so startup never holds two copies of the weights and forked server
+    # workers share one physical copy
+    state = torch.load(MODEL_PATH, map_location="cpu", mmap=True, weights_only=True)
+    model.load_state_dict(state, assign=True)
     model.eval()
-
-    # Setup preprocessing (ImageNet normalization)
-    preprocess = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
-    ])
+    # NHWC is the preferred layout for MKLDNN convs on CPU
+    model = model.to(memory_format=torch.channels_last)
+
+    # Inference-only process: disabling grad once beats pushing/popping the
+    # no_grad TLS state on every request
+    torch.set_grad_enabled(False)
+
+    # Setup preprocessing (ImageNet normalization) as a scripted, frozen graph:
+    # resize then a single fused scale+normalize pass over uint8 CHW tensors
+    preprocess = nn.Sequential(
+        transforms.Resize((224, 224), antialias=True),
+        _NormalizeUint8(IMAGENET_MEAN, IMAGENET_STD),
+    )
+    preprocess = torch.jit.freeze(torch.jit.script(preprocess.eval()))
+    # Warm-up pays the JIT optimization cost at load time, not on the first request
+    preprocess(torch.zeros(1, 3, 224, 224, dtype=torch.uint8))
+
+    # Overridable so multi-worker deployments can divide cores between workers
+    torch.set_num_threads(int(os.environ.get("TORCH_NUM_THREADS", os.cpu_count())))
+
+    # Backend priority: torch.compile (opt-in) > INT8 TorchScript > ONNX Runtime
+    # > FP32 TorchScript
+    if os.environ.get("WILDFIRE_TORCH_COMPILE") == "1":
+        # TorchInductor C++/OpenMP codegen, specialized per input shape.
+        # Opt-in via env flag since Inductor can regress on some hardware.
+        # With dynamic=False each batch size gets its own compile, and the
+        # micro-batcher feeds sizes 1.._BATCH_MAX — warm them all at startup
+        # so no live request ever blocks on a recompile
+        model = torch.compile(model, mode="reduce-overhead", dynamic=False)
+        with torch.inference_mode():
+            for _ in range(2):
+                for batch_size in range(1, _BATCH_MAX + 1):
+                    model(
+                        torch.zeros(batch_size, 3, 224, 224).to(
+                            memory_format=torch.channels_last
+                        )
+                    )
+    elif INT8_PATH.exists():
+        # Offline-quantized model (models/quantize_wildfire_resnet18.py):
+        # int8 weights/activations use VNNI convs and ~4x less weight memory
+        model = torch.jit.load(str(INT8_PATH), map_location="cpu")
+        model.eval()
+        with torch.inference_mode():
+            for _ in range(2):
+                model(torch.zeros(1, 3, 224, 224))
+    else:
+        if ort is not None:
+            # ONNX Runtime: graph-level fusion (Conv+BN+ReLU) and no per-op
+            # Python dispatch, which dominates batch=1 latency. Export or
+            # session failures must not take the server down, so fall through
+            # to the TorchScript path instead
+            try:
+                if not ONNX_PATH.exists():
+                    torch.onnx.export(
+                        model,
+                        torch.randn(1, 3, 224, 224),
+                        str(ONNX_PATH),
+                        input_names=["input"],
+                        output_names=["output"],
+                        opset_version=17,
+                        dynamic_axes={"input": {0: "batch"}},
+                    )
+                opts = ort.SessionOptions()
+                opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                opts.intra_op_num_threads = os.cpu_count()
+                _session = ort.InferenceSession(
+                    str(ONNX_PATH), sess_options=opts, providers=["CPUExecutionProvider"]
+                )
+            except Exception as e:
+                app.logger.warning(
+                    "ONNX backend unavailable (%s); falling back to TorchScript", e
+                )
+        if _session is None:
+            # TorchScript fallback: freezing folds BatchNorm into the preceding
+            # Conv and strips training-mode branches; optimize_for_inference adds
+            # MKLDNN weight packing for CPU convs
+            model = torch.jit.optimize_for_inference(torch.jit.freeze(torch.jit.script(model)))
+            # Warm up twice so the JIT's on-first-call optimization runs at startup
+            with torch.inference_mode():
+                for _ in range(2):
+                    model(torch.zeros(1, 3, 224, 224))
 
     _model = model
     _preprocess = preprocess
@@ -60,6 +247,61 @@ def load_model():
     return model, preprocess
 
 
+def _run_inference(input_tensor):
+    """Run the model on a (B, 3, 224, 224) batch; returns fire probabilities."""
+    if _session is not None:
+        logits = _session.run(None, {"input": input_tensor.numpy()})[0]
+        return torch.sigmoid(torch.from_numpy(logits))
+    # inference_mode is cheaper than no_grad (skips view/version tracking too)
+    with torch.inference_mode():
+        return torch.sigmoid(_model(input_tensor.to(memory_format=torch.channels_last)))
+
+
+# Micro-batching: concurrent requests are drained from a queue and run as one
+# forward pass, amortizing dispatch overhead across the batch
+_BATCH_MAX = 8
+_BATCH_WAIT_S = 0.010
+_batch_queue = queue.Queue()
+_batch_lock = threading.Lock()
+_batch_thread = None
+
+
+def _batch_worker():
+    while True:
+        batch = [_batch_queue.get()]
+        deadline = time.monotonic() + _BATCH_WAIT_S
+        while len(batch) < _BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_batch_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            probs = _run_inference(torch.cat([t for t, _ in batch])).flatten().tolist()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            continue
+        for (_, future), prob in zip(batch, probs):
+            future.set_result(prob)
+
+
+def _submit_inference(input_tensor):
+    """Queue one (1, 3, 224, 224) input for the batch worker; returns its probability."""
+    global _batch_thread
+    if _batch_thread is None:
+        # Started lazily (not at import) so forked server workers each get one
+        with _batch_lock:
+            if _batch_thread is None:
+                _batch_thread = threading.Thread(target=_batch_worker, daemon=True)
+                _batch_thread.start()
+    future = Future()
+    _batch_queue.put((input_tensor, future))
+    return future.result(timeout=30)
+
+
 @app.route("/predict", methods=["POST"])
 def predict():
     """Predict wildfire from uploaded image."""
@@ -73,20 +315,17 @@ def predict():
         if file.filename == "":
             return jsonify({"error": "Empty filename"}), 400
 
-        # Load and preprocess image
+        # Load and decode image
         img_bytes = file.read()
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
 
         # Get model and preprocess
-        model, preprocess = load_model()
+        _, preprocess = load_model()
 
         # Preprocess image
-        input_tensor = preprocess(img).unsqueeze(0)
+        input_tensor = preprocess(_image_to_tensor(img_bytes).unsqueeze(0))
 
         # Run inference
-        with torch.no_grad():
-            output = model(input_tensor)
-            prob = torch.sigmoid(output).item()
+        prob = _submit_inference(input_tensor)
 
         return jsonify({
             "fire_detected": prob > 0.5,
@@ -98,6 +337,78 @@ def predict():
         return jsonify({"error": str(e)}), 500
 
 
+# Cap fetched bodies so a bad URL cannot balloon per-request memory
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+
+
+class ImageFetchError(Exception):
+    """Raised when a fetched URL body cannot be used as an image input."""
+
+    def __init__(self, message, status=415):
+        super().__init__(message)
+        self.status = status
+
+
+def _looks_like_image(head):
+    """Check the magic number of the first response bytes for a known image format."""
+    return (
+        head.startswith(b"\xff\xd8\xff")  # JPEG
+        or head.startswith(b"\x89PNG")  # PNG
+        or (head[:4] == b"RIFF" and head[8:12] == b"WEBP")  # WEBP
+        or head.startswith(b"GIF8")  # GIF
+    )
+
+
+# Use full browser-like headers so image hosts (CDNs, news sites) don't return 403
+_FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "/",
+}
+
+
+@lru_cache(maxsize=256)
+def _infer_url(image_url):
+    """Fetch, decode and classify an image URL; returns (prob, base64, content_type).
+
+    Cached per URL: dashboards re-poll the same image, and a cache hit skips
+    the download, decode and inference entirely. Failures are not cached.
+    """
+    resp = _http.get(image_url, timeout=15, headers=_FETCH_HEADERS, stream=True)
+    resp.raise_for_status()
+    # Validate against the header as actually sent (empty when absent) — the
+    # image/jpeg default is only for the response, not for skipping validation
+    content_type = (resp.headers.get("Content-Type") or "").split(";")[0].strip()
+
+    # Validate the first bytes before pulling the rest of the body, so an HTML
+    # error page or other non-image is rejected without downloading it
+    chunks = resp.iter_content(64 * 1024)
+    head = next(chunks, b"")
+    if not (_looks_like_image(head) or content_type.startswith("image/")):
+        raise ImageFetchError(
+            f"URL did not return an image (Content-Type: {content_type or 'unknown'})"
+        )
+
+    buf = io.BytesIO()
+    buf.write(head)
+    for chunk in chunks:
+        buf.write(chunk)
+        if buf.tell() > MAX_IMAGE_BYTES:
+            raise ImageFetchError("Image exceeds the 15 MB limit", status=413)
+    img_bytes = buf.getvalue()
+
+    # The decoded bitmap and input tensor are scoped to this call so neither
+    # outlives inference; only the original fetched bytes are kept around
+    _, preprocess = load_model()
+    prob = _submit_inference(preprocess(_image_to_tensor(img_bytes).unsqueeze(0)))
+
+    # Base64 the same bytes we fetched (no re-encode) so the dashboard can
+    # display the exact image used for inference (avoids 403)
+    image_b64 = _b64.b64encode(img_bytes).decode("ascii")
+    return prob, image_b64, content_type or "image/jpeg"
+
+
 @app.route("/predict-from-url", methods=["POST"])
 def predict_from_url():
     """Predict wildfire from image URL. Server fetches the image (avoids browser CORS)."""
@@ -110,27 +421,7 @@ def predict_from_url():
         if not image_url:
             return jsonify({"error": "Empty image_url"}), 400
 
-        # Use full browser-like headers so image hosts (CDNs, news sites) don't return 403
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "/",
-        }
-        resp = requests.get(image_url, timeout=15, headers=headers)
-        resp.raise_for_status()
-        img_bytes = resp.content
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-
-        model, preprocess = load_model()
-        input_tensor = preprocess(img).unsqueeze(0)
-        with torch.no_grad():
-            output = model(input_tensor)
-            prob = torch.sigmoid(output).item()
-
-        # Return the same image we used for inference so the dashboard can display it (avoids 403)
-        content_type = (resp.headers.get("Content-Type") or "image/jpeg").split(";")[0].strip()
-        image_b64 = base64.b64encode(img_bytes).decode("ascii")
+        prob, image_b64, content_type = _infer_url(image_url)
 
         return jsonify({
             "fire_detected": prob > 0.5,
@@ -139,6 +430,8 @@ def predict_from_url():
             "image_base64": image_b64,
             "image_content_type": content_type,
         })
+    except ImageFetchError as e:
+        return jsonify({"error": str(e)}), e.status
     except requests.RequestException as e:
         return jsonify({"error": f"Failed to fetch image: {e}"}), 400
     except Exception as e:
@@ -0,0 +1,18 @@
+"""
+Gunicorn entry point for the wildfire image API.
+
+Loads the model at import time so `--preload` pays the load cost once in the
+master process; the mmapped weights are then shared copy-on-write across
+workers instead of each worker holding its own copy.
+
+Run from the api/ directory:
+
+    gunicorn -w 4 --preload --threads 2 -b 0.0.0.0:5001 wsgi:app
+
+Set TORCH_NUM_THREADS (and OMP_NUM_THREADS) to cpu_count / workers so the
+workers' intra-op thread pools don't oversubscribe the cores.
+"""
+
+from image_inference_api import app, load_model
+
+load_model()
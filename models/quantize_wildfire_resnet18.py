@@ -0,0 +1,75 @@
+"""
+Dev-only script: post-training INT8 quantization of the wildfire ResNet18.
+
+Run this after (re)training, pointing WILDFIRE_CALIB_DIR at a directory of
+~100 representative wildfire/no-fire images for calibration. Validate accuracy
+on a held-out set before deploying.
+Output: wildfire_resnet18_int8.pt (TorchScript), picked up automatically by
+api/image_inference_api.py when present.
+"""
+
+import os
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+from PIL import Image
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+from torchvision import models, transforms
+
+# Script lives in models/; artifacts saved in same directory
+SCRIPT_DIR = Path(__file__).resolve().parent
+MODEL_PATH = SCRIPT_DIR / "wildfire_resnet18.pth"
+INT8_PATH = SCRIPT_DIR / "wildfire_resnet18_int8.pt"
+CALIB_DIR = os.environ.get("WILDFIRE_CALIB_DIR", str(SCRIPT_DIR / "calibration"))
+
+MAX_CALIB_IMAGES = 100
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def main() -> None:
+    if not MODEL_PATH.is_file():
+        raise FileNotFoundError(f"FP32 model not found at {MODEL_PATH}.")
+
+    calib_paths = sorted(
+        p for p in Path(CALIB_DIR).glob("*") if p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+    if not calib_paths:
+        raise FileNotFoundError(
+            f"No calibration images found in {CALIB_DIR}. "
+            "Set WILDFIRE_CALIB_DIR to a directory of representative images."
+        )
+
+    # Same architecture and preprocessing as the API
+    model = models.resnet18()
+    model.fc = nn.Linear(512, 1)
+    model.load_state_dict(torch.load(MODEL_PATH, map_location="cpu"))
+    model.eval()
+
+    preprocess = transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+    ])
+
+    example = torch.randn(1, 3, 224, 224)
+    prepared = prepare_fx(
+        model, get_default_qconfig_mapping("x86"), example_inputs=(example,)
+    )
+
+    # Calibrate observers on representative inputs
+    with torch.no_grad():
+        for path in calib_paths[:MAX_CALIB_IMAGES]:
+            img = Image.open(path).convert("RGB")
+            prepared(preprocess(img).unsqueeze(0))
+
+    quantized = convert_fx(prepared)
+    torch.jit.save(torch.jit.script(quantized), str(INT8_PATH))
+
+    print(f"Calibrated on {min(len(calib_paths), MAX_CALIB_IMAGES)} images")
+    print(f"[SUCCESS] INT8 model saved to {INT8_PATH}")
+
+
+if __name__ == "__main__":
+    main()